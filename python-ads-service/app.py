@@ -1,7 +1,22 @@
 from flask import Flask, request, jsonify
 from google.ads.googleads.client import GoogleAdsClient
 from google.ads.googleads.errors import GoogleAdsException
+from google.ads.googleads.v21.enums.types.keyword_plan_network import KeywordPlanNetworkEnum
+from google.ads.googleads.v21.services.services.google_ads_service import GoogleAdsServiceClient
+from cachetools import TTLCache
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import chain, islice
+from logging.handlers import QueueHandler, QueueListener
+import atexit
+import hashlib
+import logging
 import os
+import queue
+import sys
+import threading
+import orjson
 from dotenv import load_dotenv
 
 # Load .env file from the parent directory
@@ -10,6 +25,18 @@ load_dotenv(dotenv_path=dotenv_path)
 
 app = Flask(__name__)
 
+# Request threads only enqueue log records; a background listener does the stdout writes
+logger = logging.getLogger("ads")
+logger.setLevel(logging.INFO)
+logger.propagate = False
+_log_queue = queue.SimpleQueue()
+_console_handler = logging.StreamHandler(sys.stdout)
+_console_handler.setFormatter(logging.Formatter("[Python Service] %(message)s"))
+logger.addHandler(QueueHandler(_log_queue))
+_log_listener = QueueListener(_log_queue, _console_handler)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
 LANGUAGE_MAP = {
     'de': '1001',  # German
     'en': '1000',  # English
@@ -24,9 +51,37 @@ LANGUAGE_MAP = {
     'zh': '1017',  # Chinese
 }
 
+DEFAULT_LANGUAGE_ID = LANGUAGE_MAP['en']
+
+# Indexed by KeywordPlanCompetitionLevel enum value: UNSPECIFIED=0, UNKNOWN=1, LOW=2, MEDIUM=3, HIGH=4
+COMPETITION_MAP = ('unknown', 'unknown', 'low', 'medium', 'high')
+
 DEFAULT_COUNTRY = '2756'
 DEFAULT_LANGUAGE = 'de'
 
+# Bid amounts come back in micros (1/1,000,000 of the account currency). Divide rather than
+# multiply by 1e-6 so e.g. 50_000 micros exports as 0.05, not 0.049999999999999996
+MICROS_PER_UNIT = 1_000_000
+
+# Number of keyword rows encoded per streamed response chunk
+STREAM_CHUNK_SIZE = 100
+
+MIN_SEARCH_VOLUME = int(os.getenv("MIN_SEARCH_VOLUME", "10"))
+MAX_KEYWORDS = int(os.getenv("MAX_KEYWORDS", "500"))
+
+# Google Ads rejects a whole batch if any seed keyword is longer than this
+MAX_KEYWORD_LENGTH = 80
+
+# Upper bound on concurrent batch RPCs issued for a single request
+MAX_CONCURRENT_BATCHES = 8
+
+# Keyword idea rows per (customer, country, language, seed batch); Ads data barely moves within an hour
+KEYWORD_CACHE_TTL = int(os.getenv("KEYWORD_CACHE_TTL", "3600"))
+_keyword_cache = TTLCache(maxsize=1024, ttl=KEYWORD_CACHE_TTL)
+_keyword_cache_lock = threading.Lock()
+
+GOOGLE_SEARCH_NETWORK = KeywordPlanNetworkEnum.KeywordPlanNetwork.GOOGLE_SEARCH
+
 
 def sanitize_customer_id(customer_id):
     if not customer_id:
@@ -41,7 +96,8 @@ def build_credentials(overrides=None):
         "client_secret": os.getenv("GOOGLE_ADS_CLIENT_SECRET"),
         "refresh_token": os.getenv("GOOGLE_ADS_REFRESH_TOKEN"),
         "login_customer_id": os.getenv("GOOGLE_ADS_LOGIN_CUSTOMER_ID"),
-        "use_proto_plus": True,
+        # Raw protobuf messages skip proto-plus' per-attribute wrappers when reading results
+        "use_proto_plus": False,
     }
 
     if overrides:
@@ -62,10 +118,121 @@ def build_credentials(overrides=None):
     return credentials
 
 
-# Initialize Google Ads client
+# Resource names are pure string formatting, so remember them across requests
+@lru_cache(maxsize=None)
+def language_constant_path(language_id):
+    return GoogleAdsServiceClient.language_constant_path(language_id)
+
+
+@lru_cache(maxsize=256)
+def geo_target_constant_path(country):
+    return GoogleAdsServiceClient.geo_target_constant_path(country)
+
+
+# Env credentials are resolved once per process; the dict is shared, so treat it as read-only.
+# Call default_credentials.cache_clear() if the environment changes at runtime.
+@lru_cache(maxsize=1)
+def default_credentials():
+    return build_credentials()
+
+
+@lru_cache(maxsize=8)
+def _load_google_ads_client(credential_items):
+    client = GoogleAdsClient.load_from_dict(dict(credential_items), version="v21")
+    return client, client.get_service("KeywordPlanIdeaService")
+
+
+# Initialize Google Ads client and services, reusing the gRPC channel per credential set
 def get_google_ads_client(overrides=None):
-    credentials = build_credentials(overrides)
-    return GoogleAdsClient.load_from_dict(credentials)
+    credentials = build_credentials(overrides) if overrides else default_credentials()
+    return _load_google_ads_client(tuple(sorted(credentials.items())))
+
+
+def clean_keywords(keywords):
+    """Return trimmed, lowercased, de-duplicated seed keywords the Ads API will accept."""
+    if not isinstance(keywords, list):
+        return []
+
+    # Drop blanks and duplicates up front; every extra batch is a full RPC round trip
+    cleaned = []
+    seen = set()
+    for keyword in keywords:
+        if not isinstance(keyword, str):
+            continue
+        keyword = keyword.strip()[:MAX_KEYWORD_LENGTH].rstrip().lower()
+        if keyword and keyword not in seen:
+            seen.add(keyword)
+            cleaned.append(keyword)
+    return cleaned
+
+
+def keyword_cache_key(customer_id, country, language_id, batch):
+    # Seeds are already normalized by clean_keywords; sort so batch order doesn't matter
+    digest = hashlib.blake2b('\n'.join(sorted(batch)).encode(), digest_size=16).digest()
+    return customer_id, country, language_id, digest
+
+
+def build_keyword_ideas_request(client, customer_id, language_id, country):
+    """Return a GenerateKeywordIdeasRequest with everything but the keyword seed set."""
+    request_body = client.get_type("GenerateKeywordIdeasRequest")
+    request_body.customer_id = customer_id
+
+    # Set language resource name
+    request_body.language = language_constant_path(language_id)
+
+    # Set geo target constants
+    request_body.geo_target_constants.append(geo_target_constant_path(country))
+
+    request_body.include_adult_keywords = False
+    request_body.keyword_plan_network = GOOGLE_SEARCH_NETWORK
+    return request_body
+
+
+def google_ads_error_message(ex):
+    error_message = f"Google Ads API error: {ex.error.code().name}"
+    if ex.failure and ex.failure.errors:
+        error_message += f" - {ex.failure.errors[0].message}"
+    return error_message
+
+
+@dataclass(frozen=True, slots=True)
+class KeywordRow:
+    # Field names double as the JSON keys the Node.js client reads; orjson serializes slots dataclasses natively
+    keyword: str
+    searchVolume: int
+    competition: str
+    cpc: float
+    cpcHigh: float
+
+
+def keyword_rows(ideas, min_search_volume):
+    """Yield response rows for ideas that meet the minimum search volume."""
+    for idea in ideas:
+        metrics = idea.keyword_idea_metrics
+
+        if metrics.avg_monthly_searches >= min_search_volume:
+            # Map competition enum to string (a plain int on raw protobuf); read the field once
+            competition_level = metrics.competition
+            competition = COMPETITION_MAP[competition_level] if 0 <= competition_level < len(COMPETITION_MAP) else 'unknown'
+
+            # Unset int64 fields read as 0, so no guard is needed on the bid micros
+            yield KeywordRow(
+                idea.text,
+                int(metrics.avg_monthly_searches or 0),
+                competition,
+                metrics.low_top_of_page_bid_micros / MICROS_PER_UNIT,
+                metrics.high_top_of_page_bid_micros / MICROS_PER_UNIT,
+            )
+
+
+def stream_keyword_response(rows):
+    """Encode the keyword response in chunks instead of one large buffer."""
+    yield b'{"success":true,"keywords":['
+    for start in range(0, len(rows), STREAM_CHUNK_SIZE):
+        chunk = b','.join(orjson.dumps(row) for row in rows[start:start+STREAM_CHUNK_SIZE])
+        yield chunk if start == 0 else b',' + chunk
+    yield b'],"total":' + str(len(rows)).encode() + b'}'
+
 
 @app.route('/health', methods=['GET'])
 def health():
@@ -74,111 +241,100 @@ def health():
 @app.route('/generate-keyword-ideas', methods=['POST'])
 def generate_keyword_ideas():
     try:
-        data = request.json
-        keywords = data.get('keywords', [])
+        data = request.json or {}
+        keywords = clean_keywords(data.get('keywords', []))
         country = str(data.get('country', DEFAULT_COUNTRY))
         language = (data.get('language', DEFAULT_LANGUAGE) or DEFAULT_LANGUAGE).lower()
 
         if not keywords:
             return jsonify({"error": "No keywords provided"}), 400
 
-        language_id = LANGUAGE_MAP.get(language, LANGUAGE_MAP.get('en', '1000'))
+        language_id = LANGUAGE_MAP.get(language, DEFAULT_LANGUAGE_ID)
 
-        client = get_google_ads_client()
-        customer_id = sanitize_customer_id(os.getenv("GOOGLE_ADS_LOGIN_CUSTOMER_ID"))
+        client, keyword_plan_idea_service = get_google_ads_client()
+        customer_id = default_credentials()["login_customer_id"]
 
         if not customer_id:
             raise ValueError("GOOGLE_ADS_LOGIN_CUSTOMER_ID is not configured")
 
-        keyword_plan_idea_service = client.get_service("KeywordPlanIdeaService")
-        google_ads_service = client.get_service("GoogleAdsService")
-
-        # Use correct request format
-        request_body = client.get_type("GenerateKeywordIdeasRequest")
-        request_body.customer_id = customer_id
-
-        # Set language resource name
-        request_body.language = google_ads_service.language_constant_path(language_id)
-
-        # Set geo target constants
-        geo_target_constant = google_ads_service.geo_target_constant_path(country)
-        request_body.geo_target_constants.append(geo_target_constant)
-
-        request_body.include_adult_keywords = False
-        request_body.keyword_plan_network = client.enums.KeywordPlanNetworkEnum.GOOGLE_SEARCH
+        # Shared request template; batches only differ in their keyword seed
+        request_template = build_keyword_ideas_request(client, customer_id, language_id, country)
 
         # API v21 limit: keyword_seed.keywords only supports 20 items
         # Batch keywords into groups of 20
-        results = []
-        min_search_volume = int(os.getenv("MIN_SEARCH_VOLUME", "10"))
-        max_keywords = int(os.getenv("MAX_KEYWORDS", "500"))
+        min_search_volume = MIN_SEARCH_VOLUME
+        max_keywords = MAX_KEYWORDS
         batch_size = 20
+        batches = [keywords[i:i+batch_size] for i in range(0, len(keywords), batch_size)]
+
+        logger.info(
+            "Fetching keyword ideas for %d keywords in %d batches of %d, country: %s, language: %s",
+            len(keywords), len(batches), batch_size, country, language,
+        )
 
-        print(f"[Python Service] Fetching keyword ideas for {len(keywords)} keywords in batches of {batch_size}, country: {country}, language: {language}")
+        def fetch_batch(batch_number, batch):
+            cache_key = keyword_cache_key(customer_id, country, language_id, batch)
+            with _keyword_cache_lock:
+                cached_rows = _keyword_cache.get(cache_key)
+            if cached_rows is not None:
+                logger.debug("Batch %d served from cache", batch_number)
+                return cached_rows
 
-        for i in range(0, len(keywords), batch_size):
-            batch = keywords[i:i+batch_size]
-            print(f"[Python Service] Processing batch {i//batch_size + 1}: {len(batch)} keywords")
+            logger.debug("Processing batch %d: %d keywords", batch_number, len(batch))
 
-            # Create new request for each batch
-            batch_request = client.get_type("GenerateKeywordIdeasRequest")
-            batch_request.customer_id = customer_id
-            batch_request.language = google_ads_service.language_constant_path(language_id)
-            batch_request.geo_target_constants.append(geo_target_constant)
-            batch_request.include_adult_keywords = False
-            batch_request.keyword_plan_network = client.enums.KeywordPlanNetworkEnum.GOOGLE_SEARCH
+            # Copy the template per batch; workers run concurrently so it can't be reused in place
+            batch_request = type(request_template)()
+            client.copy_from(batch_request, request_template)
             batch_request.keyword_seed.keywords.extend(batch)
 
+            # Build rows inside the worker so they are ready when the handler reaches this batch.
+            # No single batch can contribute more than max_keywords rows, so stop reading there.
             response = keyword_plan_idea_service.generate_keyword_ideas(request=batch_request)
-
-            for idea in response:
-                metrics = idea.keyword_idea_metrics
-
-                if metrics.avg_monthly_searches >= min_search_volume:
-                    # Map competition enum to string
-                    competition_map = {
-                        0: 'unknown',
-                        1: 'low',
-                        2: 'medium',
-                        3: 'high',
-                    }
-                    competition = competition_map.get(metrics.competition, 'unknown')
-
-                    results.append({
-                        "keyword": idea.text,
-                        "searchVolume": int(metrics.avg_monthly_searches or 0),
-                        "competition": competition,
-                        "cpc": float(metrics.low_top_of_page_bid_micros / 1000000) if metrics.low_top_of_page_bid_micros else 0,
-                        "cpcHigh": float(metrics.high_top_of_page_bid_micros / 1000000) if metrics.high_top_of_page_bid_micros else 0,
-                    })
-
-                if len(results) >= max_keywords:
-                    break
-
-            if len(results) >= max_keywords:
-                print(f"[Python Service] Reached max keywords limit ({max_keywords})")
-                break
-
-        print(f"[Python Service] Successfully returned {len(results)} keywords")
-
-        return jsonify({
-            "success": True,
-            "keywords": results,
-            "total": len(results)
-        }), 200
+            rows = list(islice(keyword_rows(response, min_search_volume), max_keywords))
+
+            # Rows are frozen and the list is never mutated, so it is safe to share between requests
+            with _keyword_cache_lock:
+                _keyword_cache[cache_key] = rows
+            return rows
+
+        # The RPCs are I/O bound, so fire all batches at once and consume them in batch order
+        executor = ThreadPoolExecutor(max_workers=min(len(batches), MAX_CONCURRENT_BATCHES))
+        try:
+            futures = [
+                executor.submit(fetch_batch, number, batch)
+                for number, batch in enumerate(batches, start=1)
+            ]
+
+            batch_rows = (future.result() for future in futures)
+            results = list(islice(chain.from_iterable(batch_rows), max_keywords))
+        finally:
+            # Once we have enough rows or a batch has failed, drop batches that have not started
+            # and return without waiting; in-flight batches finish in the background and still
+            # populate the keyword cache
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        if len(results) >= max_keywords:
+            logger.info("Reached max keywords limit (%d)", max_keywords)
+
+        logger.info("Successfully returned %d keywords", len(results))
+
+        # Every batch we return rows from has finished by now, so errors above still map to
+        # proper status codes; only the encoding is streamed
+        return app.response_class(
+            stream_keyword_response(results),
+            status=200,
+            mimetype="application/json",
+        )
 
     except GoogleAdsException as ex:
-        print(f"[Python Service] Google Ads API error: {ex}")
-        error_message = f"Google Ads API error: {ex.error.code().name}"
-        if ex.failure:
-            error_message += f" - {ex.failure.errors[0].message}"
-        return jsonify({"error": error_message}), 500
+        logger.error("Google Ads API error: %s", ex)
+        return jsonify({"error": google_ads_error_message(ex)}), 500
 
     except ValueError as e:
-        print(f"[Python Service] Configuration error: {str(e)}")
+        logger.error("Configuration error: %s", e)
         return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print(f"[Python Service] Error: {str(e)}")
+        logger.exception("Error: %s", e)
         return jsonify({"error": str(e)}), 500
 
 
@@ -187,14 +343,12 @@ def test_credentials():
     try:
         data = request.json or {}
         credentials = data.get('credentials') or {}
-        keywords = data.get('keywords') or ['test keyword']
-        if not isinstance(keywords, list) or len(keywords) == 0:
-            keywords = ['test keyword']
+        keywords = clean_keywords(data.get('keywords')) or ['test keyword']
 
         country = str(data.get('country', DEFAULT_COUNTRY))
         language = (data.get('language', DEFAULT_LANGUAGE) or DEFAULT_LANGUAGE).lower()
 
-        client = get_google_ads_client(credentials)
+        client, keyword_plan_idea_service = get_google_ads_client(credentials)
         customer_id = sanitize_customer_id(
             credentials.get('login_customer_id') or os.getenv("GOOGLE_ADS_LOGIN_CUSTOMER_ID")
         )
@@ -202,17 +356,11 @@ def test_credentials():
         if not customer_id:
             raise ValueError('login_customer_id is required to test credentials')
 
-        keyword_plan_idea_service = client.get_service("KeywordPlanIdeaService")
-        google_ads_service = client.get_service("GoogleAdsService")
-
-        request_body = client.get_type("GenerateKeywordIdeasRequest")
-        request_body.customer_id = customer_id
-        language_id = LANGUAGE_MAP.get(language, LANGUAGE_MAP.get('en', '1000'))
-        request_body.language = google_ads_service.language_constant_path(language_id)
-        request_body.geo_target_constants.append(google_ads_service.geo_target_constant_path(country))
-        request_body.include_adult_keywords = False
-        request_body.keyword_plan_network = client.enums.KeywordPlanNetworkEnum.GOOGLE_SEARCH
+        language_id = LANGUAGE_MAP.get(language, DEFAULT_LANGUAGE_ID)
+        request_body = build_keyword_ideas_request(client, customer_id, language_id, country)
         request_body.keyword_seed.keywords.extend(keywords[:10])
+        # A single idea proves the credentials work
+        request_body.page_size = 1
 
         response = keyword_plan_idea_service.generate_keyword_ideas(request=request_body)
 
@@ -228,19 +376,17 @@ def test_credentials():
         }), 200
 
     except ValueError as error:
-        print(f"[Python Service] Credential validation error: {str(error)}")
+        logger.error("Credential validation error: %s", error)
         return jsonify({"success": False, "error": str(error)}), 400
     except GoogleAdsException as ex:
-        print(f"[Python Service] Google Ads credential test error: {ex}")
-        error_message = f"Google Ads API error: {ex.error.code().name}"
-        if ex.failure and ex.failure.errors:
-            error_message += f" - {ex.failure.errors[0].message}"
-        return jsonify({"success": False, "error": error_message}), 500
+        logger.error("Google Ads credential test error: %s", ex)
+        return jsonify({"success": False, "error": google_ads_error_message(ex)}), 500
     except Exception as e:
-        print(f"[Python Service] Unexpected credential test error: {str(e)}")
+        logger.exception("Unexpected credential test error: %s", e)
         return jsonify({"success": False, "error": str(e)}), 500
 
+# Development server only; use `gunicorn -c gunicorn.conf.py app:app` for concurrent serving
 if __name__ == '__main__':
     port = int(os.getenv('PYTHON_SERVICE_PORT', 5001))
-    print(f"[Python Service] Starting on port {port}")
-    app.run(host='0.0.0.0', port=port, debug=False)
+    logger.info("Starting on port %d", port)
+    app.run(host='0.0.0.0', port=port, debug=False, threaded=True)
@@ -0,0 +1,16 @@
+import os
+from dotenv import load_dotenv
+
+# gunicorn reads this file before any worker imports app.py, so load the shared
+# root .env here too or the settings below would ignore it
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env'))
+
+# Production entry point: gunicorn -c gunicorn.conf.py app:app
+# Requests spend nearly all their time waiting on Google Ads RPCs, so threads
+# give real concurrency while sharing each worker's cached gRPC channel.
+bind = f"0.0.0.0:{os.getenv('PYTHON_SERVICE_PORT', '5001')}"
+workers = int(os.getenv('PYTHON_SERVICE_WORKERS', '2'))
+worker_class = 'gthread'
+threads = int(os.getenv('PYTHON_SERVICE_THREADS', '32'))
+# Keyword lookups can take a while with many batches; match the Node client's 2 minute timeout
+timeout = 120